@@ -1,33 +1,39 @@
 """ common module """
 import time
-import random
-from collections import OrderedDict, defaultdict
+from collections import OrderedDict
 
 import numpy as np
 import networkx as nx
+from scipy import sparse
 from qiskit.aqua import aqua_globals
 from qiskit.aqua.operators import StateFn
 
+# below this many spin-term products numpy is faster than loading or compiling the kernel
+_JIT_MIN_WORK = 10 ** 8
+
 
 def get_ising_matrix(qubo_mat: np.array):
     """
     calculate the ising matrix according to the Q matrix of problems.
 
     Args:
-        q_mat: the matrix Q in QUBO model of the problem
+        q_mat: the matrix Q in QUBO model of the problem, dense or scipy sparse
 
     Returns:
-        ising_mat (np.array): the the matrix of ising model
+        ising_mat (np.array): the the matrix of ising model, sparse if q_mat is sparse
     """
 
-    ising_mat = np.zeros_like(qubo_mat, dtype='float')  #.copy()
-    mat_len = np.size(qubo_mat, 0)
-    for i in range(mat_len):
-        for j in range(mat_len):
-            if i == j:
-                ising_mat[i][i] = 1.0 * np.true_divide(qubo_mat[i][i], 2.0) + np.sum(qubo_mat[i]) - qubo_mat[i][i]
-            else:
-                ising_mat[i][j] = 1.0 * np.true_divide(qubo_mat[i][j], 4.0)
+    if sparse.issparse(qubo_mat):
+        qubo_mat = sparse.csr_matrix(qubo_mat, dtype=np.float64)
+        diag = qubo_mat.diagonal()
+        ising_mat = (qubo_mat * 0.25).tolil()
+        ising_mat.setdiag(0.5 * diag + np.asarray(qubo_mat.sum(axis=1)).ravel() - diag)
+        return ising_mat.tocsr()
+
+    qubo_mat = np.asarray(qubo_mat).astype(np.float64, copy=False)
+    diag = np.diag(qubo_mat)
+    ising_mat = qubo_mat * 0.25
+    np.fill_diagonal(ising_mat, 0.5 * diag + qubo_mat.sum(axis=1) - diag)
 
     return ising_mat
 
@@ -36,61 +42,89 @@ def get_weights_graph(ising_mat: np.array, graph: nx.Graph=None):
     """
     use ising matirx as adjacency matrix to generate correspondence graph model
     Args:
-        ising_mat (np.array): the Ising matrix that used to generate graph
+        ising_mat (np.array): the Ising matrix that used to generate graph, dense or scipy sparse
 
     Returns:
         graph (nx.Graph): the graph model generated by ising matrix
     """
 
-    cnt = np.size(ising_mat, 0)
-    node_map = defaultdict(int)
+    cnt = ising_mat.shape[0]
     if graph is not None:
-        node_list = list(graph.nodes)
-        for i in range(len(node_list)):
-            node_map[i] = node_list[i]
+        node_map = dict(enumerate(graph.nodes))
+    else:
+        node_map = {i: i for i in range(cnt)}
+
+    if sparse.issparse(ising_mat):
+        ising_mat = sparse.csr_matrix(ising_mat, dtype=float)
+        node_w = ising_mat.diagonal()
+        coupling = (sparse.triu(ising_mat, k=1) + sparse.tril(ising_mat, k=-1)).tocsr()
+        mask = abs(coupling) > 1e-8
+        pattern = sparse.triu(mask + mask.T, k=1).tocoo()
+        rows, cols = pattern.row, pattern.col
+        edge_w = np.zeros(len(rows))
+        if len(rows) > 0:  # scipy returns a sparse matrix instead of values for empty indices
+            upper_w = np.asarray(coupling[rows, cols]).ravel()
+            lower_w = np.asarray(coupling[cols, rows]).ravel()
+            # the lower triangle takes precedence where it is nonzero, as in the dense case
+            edge_w = np.where(np.abs(lower_w) > 1e-8, lower_w, upper_w)
     else:
-        for i in range(cnt):
-            node_map[i] = i
+        node_w = np.diag(ising_mat)
+        coupling = np.array(ising_mat, dtype=float)
+        np.fill_diagonal(coupling, 0.)
+        mask = np.abs(coupling) > 1e-8
+        rows, cols = np.nonzero(np.triu(mask | mask.T, k=1))
+        # the lower triangle takes precedence where it is nonzero, as the entry (j, i)
+        # used to overwrite the edge added for (i, j)
+        edge_w = np.where(mask[cols, rows], coupling[cols, rows], coupling[rows, cols])
 
     graph = nx.Graph()
-    for i in range(cnt):
-        for j in range(cnt):
-            if i == j:
-                graph.add_node(node_map[i], weight=ising_mat[i][i])
-            else:
-                if abs(ising_mat[i][j] - 0.) <= 1e-8:
-                    continue
-                graph.add_edge(node_map[i], node_map[j], weight=ising_mat[i][j])
+    graph.add_nodes_from((node_map[i], {'weight': w}) for i, w in enumerate(node_w.tolist()))
+    graph.add_weighted_edges_from((node_map[u], node_map[v], w)
+                                  for u, v, w in zip(rows.tolist(), cols.tolist(), edge_w.tolist()))
 
     return graph    
 
 
 def get_most_small_ising(state_count, ising_g):
+    """
+    find the sampled state with the lowest energy of the ising model
+    Args:
+        state_count (dict): map from sampled bit string to its count
+        ising_g (nx.Graph): the graph model of ising problem
+
+    Returns:
+        res_state (list): the bits of the state with the lowest energy
+    """
 
     nodew = nx.get_node_attributes(ising_g, 'weight')
     edw = nx.get_edge_attributes(ising_g, 'weight')
 
-    min_h = 999999
-    for key, val in state_count.items():
-        tmp_h = 0
-        tw = []
-        for i in range(len(key)):
-            if key[i] == '0':
-                tw.append(-1)
-            else:
-                tw.append(1)
-
-        for nd in nodew:
-            tmp_h += nodew[nd] * tw[nd]
-        for ed in edw:
-            if ed[0] == ed[1]:
-                continue
-            tmp_h += edw[ed] * tw[ed[0]] * tw[ed[1]]
-
-        if min_h > tmp_h:
-            min_h = tmp_h
-            res_state = [int(key[i]) for i in range(len(key))]
-    return res_state
+    keys = list(state_count)
+    state_num, bit_num = len(keys), len(keys[0])
+    # one ascii byte per bit, mapped to spins without looping over the characters
+    bits = np.frombuffer(''.join(keys).encode('ascii'), dtype=np.uint8).reshape(state_num, bit_num) == ord('1')
+    spins = np.where(bits, 1, -1).astype(np.int8)
+
+    h = np.zeros(bit_num)
+    for nd, w in nodew.items():
+        h[nd] = w
+    couplings = [(ed[0], ed[1], w) for ed, w in edw.items() if ed[0] != ed[1]]
+    u_idx = np.array([c[0] for c in couplings], dtype=np.int64)
+    v_idx = np.array([c[1] for c in couplings], dtype=np.int64)
+    edges_w = np.array([c[2] for c in couplings], dtype=float)
+
+    energy = None
+    if state_num * (bit_num + len(edges_w)) >= _JIT_MIN_WORK:
+        try:
+            # importing numba takes a while, so it is only loaded for scans large enough to gain
+            from Qcover.applications.ising_kernel import ising_energy
+        except ImportError:  # numba is optional, energies are then evaluated with numpy
+            pass
+        else:
+            energy = ising_energy(spins, h, u_idx, v_idx, edges_w)
+    if energy is None:
+        energy = spins @ h + (spins[:, u_idx] * spins[:, v_idx] * edges_w).sum(axis=1)
+    return bits[int(np.argmin(energy))].astype(int).tolist()
 
 
 def random_regular_graph(node_num, degree=3, weight_range=10, negative_weight=False, seed=None):
@@ -116,22 +150,26 @@ def random_regular_graph(node_num, degree=3, weight_range=10, negative_weight=Fa
         # random.seed(seed)
 
     random_g = nx.random_regular_graph(d=degree, n=node_num, seed=seed)
+    rng = np.random.default_rng(seed)
+
+    edges = list(random_g.edges)
+    edge_w = _random_weights(rng, len(edges), weight_range, negative_weight)
+    nx.set_edge_attributes(random_g, dict(zip(edges, edge_w)), 'weight')
 
-    for e in random_g.edges:
-        w = random.uniform(1, weight_range)   # np.random.randint(1, weight_range)
-        if np.random.random() >= 0.5 and negative_weight:
-            w *= -1
-        random_g.add_edge(e[0], e[1], weight=w)
-
-    for e in random_g.nodes:
-        w = random.uniform(1, weight_range)
-        if np.random.random() >= 0.5 and negative_weight:
-            w *= -1
-        random_g.add_node(e, weight=w)
-        random_g.add_edge(e, e, weight=w)
+    nodes = list(random_g.nodes)
+    node_w = _random_weights(rng, len(nodes), weight_range, negative_weight)
+    nx.set_node_attributes(random_g, dict(zip(nodes, node_w)), 'weight')
     return random_g
 
 
+def _random_weights(rng, size, weight_range, negative_weight):
+    """draw weights in [1, weight_range), flipping their signs at random if negative_weight"""
+    weights = rng.uniform(1, weight_range, size=size)
+    if negative_weight:
+        weights *= np.where(rng.random(size) >= 0.5, -1.0, 1.0)
+    return weights.tolist()
+
+
 def random_number_list(n, weight_range=(1, 100), seed=None):
     """Generate a set of positive integers within the given range.
 
@@ -0,0 +1,21 @@
+""" numba kernel of the ising energy scan, only imported for large numbers of sampled states """
+import numpy as np
+from numba import njit, prange
+
+
+@njit(parallel=True, cache=True)
+def ising_energy(spins, h, u_idx, v_idx, edges_w):
+    """
+    calculate the energy of every spin configuration from the node weights h
+    and the couplings edges_w between the spins u_idx and v_idx
+    """
+    state_num, bit_num = spins.shape
+    energy = np.empty(state_num)
+    for k in prange(state_num):
+        e = 0.0
+        for i in range(bit_num):
+            e += h[i] * spins[k, i]
+        for j in range(len(edges_w)):
+            e += edges_w[j] * spins[k, u_idx[j]] * spins[k, v_idx[j]]
+        energy[k] = e
+    return energy
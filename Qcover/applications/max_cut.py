@@ -5,6 +5,7 @@ import time
 import numpy as np
 import networkx as nx
 import random
+from scipy import sparse
 import matplotlib.pyplot as plt
 from Qcover.applications.common import get_ising_matrix, get_weights_graph, random_regular_graph
 
@@ -38,6 +39,8 @@ class MaxCut:
             self._graph = graph
 
         self._qmatrix = None
+        self._ising_mat = None
+        self._mc_graph = None
 
     @property
     def node_num(self):
@@ -53,42 +56,60 @@ class MaxCut:
                                            degree=node_degree,
                                            weight_range=weight_range,
                                            seed=seed)
+        self._qmatrix = None
+        self._ising_mat = None
+        self._mc_graph = None
 
     def get_Qmatrix(self):
         """
         get the Q matrix in QUBO model of max cut problem
         Args:
-            adjacent_mat (np.array): the adjacent matrix of graph G of the problem
+            self._graph (nx.Graph): the graph G of the problem
 
         Returns:
-            q_mat (np.array): the the Q matrix of QUBO model.
+            q_mat (scipy.sparse.csr_matrix): the the Q matrix of QUBO model.
         """
-        adj_mat = nx.adjacency_matrix(self._graph).A
-        qubo_mat = adj_mat.copy()
-        for i in range(self._node_num):
-            qubo_mat[i][i] = - (np.sum(adj_mat[i]) - adj_mat[i][i])
+        adj_mat = nx.adjacency_matrix(self._graph)
+        degree = np.asarray(adj_mat.sum(axis=1)).ravel() - adj_mat.diagonal()
+        qubo_mat = sparse.lil_matrix(adj_mat)
+        qubo_mat.setdiag(-degree)
 
-        return qubo_mat
+        return qubo_mat.tocsr()
 
     def max_cut_value(self, x, w):
         """Compute the value of a cut.
 
         Args:
             x (numpy.ndarray): binary string as numpy array.
-            w (numpy.ndarray): adjacency matrix.
+            w (numpy.ndarray / scipy.sparse matrix): adjacency matrix.
 
         Returns:
             float: value of the cut.
         """
-        X = np.outer(x, (1 - x))
-        return np.sum(w * X)
+        xf = np.asarray(x).astype(np.float64, copy=False)
+        return float(xf @ w.dot(1.0 - xf))
+
+    def max_cut_values(self, X, w):
+        """Compute the values of a batch of cuts in one call.
+
+        Args:
+            X (numpy.ndarray): binary strings stacked row by row, shape (K, n).
+            w (numpy.ndarray / scipy.sparse matrix): adjacency matrix.
+
+        Returns:
+            numpy.ndarray: values of the K cuts.
+        """
+        X = np.atleast_2d(np.asarray(X)).astype(np.float64, copy=False)
+        return np.einsum('ki,ki->k', X, np.asarray(w.dot((1.0 - X).T)).T)
 
     def run(self):
         if self._qmatrix is None:
             self._qmatrix = self.get_Qmatrix()
 
-        qubo_mat = self._qmatrix
-        ising_mat = get_ising_matrix(qubo_mat)
-        mc_graph = get_weights_graph(ising_mat)
-        return mc_graph
+        if self._ising_mat is None:
+            self._ising_mat = get_ising_matrix(self._qmatrix)
+
+        if self._mc_graph is None:
+            self._mc_graph = get_weights_graph(self._ising_mat)
+        return self._mc_graph
 
@@ -9,6 +9,35 @@ logger = logging.getLogger(__name__)
 
 # pylint: disable=invalid-name
 
+class ExpectationPath:
+    """Growable buffer of the expectation values calculated in every iteration."""
+
+    def __init__(self, capacity: int = 64) -> None:
+        self._values = np.empty(capacity)
+        self._size = 0
+
+    def append(self, value):
+        if self._size == len(self._values):
+            values = np.empty(2 * len(self._values))
+            values[: self._size] = self._values
+            self._values = values
+        self._values[self._size] = value
+        self._size += 1
+
+    @property
+    def values(self):
+        return self._values[: self._size]
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, item):
+        return self.values[item]
+
+    def __iter__(self):
+        return iter(self.values)
+
+
 class Backend(ABC):
     """Base class for backend."""
 
@@ -5,6 +5,7 @@ import matplotlib.pyplot as plt
 from multiprocessing import Pool, cpu_count
 import networkx as nx
 import cirq
+from Qcover.backends.backend import ExpectationPath
 
 class CircuitByCirq:
     """generate a instance of CircuitByCirq"""
@@ -23,7 +24,7 @@ class CircuitByCirq:
 
         self._element_to_graph = None
         self._pargs = None
-        self._expectation_path = []
+        self._expectation_path = ExpectationPath()
 
     def get_operator(self, element, qubit_num):
         qubits = cirq.LineQubit.range(qubit_num)
@@ -147,7 +148,7 @@ class CircuitByCirq:
 
     def visualization(self):
         plt.figure()
-        plt.plot(range(1, len(self._expectation_path) + 1), self._expectation_path, "ob-", label="cirq")
+        plt.plot(range(1, len(self._expectation_path) + 1), self._expectation_path.values, "ob-", label="cirq")
         plt.ylabel('Expectation value')
         plt.xlabel('Number of iterations')
         plt.legend()
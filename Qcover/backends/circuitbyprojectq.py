@@ -11,6 +11,7 @@ from projectq.backends import ResourceCounter
 from projectq import MainEngine
 from projectq.ops import QubitOperator, All, H, Rx, Measure, MatrixGate, Rz, Rzz, Z
 from projectq.setups import linear
+from Qcover.backends.backend import ExpectationPath
 
 
 class CircuitByProjectq:
@@ -29,7 +30,7 @@ class CircuitByProjectq:
 
         self._element_to_graph = None
         self._pargs = None
-        self._expectation_path = []
+        self._expectation_path = ExpectationPath()
 
     @staticmethod
     def get_operator(element):
@@ -150,7 +151,7 @@ class CircuitByProjectq:
 
     def visualization(self):
         plt.figure()
-        plt.plot(range(1, len(self._expectation_path) + 1), self._expectation_path, "ob-", label="projectq")
+        plt.plot(range(1, len(self._expectation_path) + 1), self._expectation_path.values, "ob-", label="projectq")
         plt.ylabel('Expectation value')
         plt.xlabel('Number of iterations')
         plt.legend()
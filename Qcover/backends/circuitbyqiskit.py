@@ -11,6 +11,7 @@ from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister, Aer, asse
 from qiskit.aqua import QuantumInstance, aqua_globals
 from qiskit.aqua.operators import PauliExpectation, CircuitSampler, StateFn, CircuitOp, CircuitStateFn, \
     MatrixExpectation, X, Y, Z, I
+from Qcover.backends.backend import ExpectationPath
 
 expectation_path = []
 
@@ -32,7 +33,7 @@ class CircuitByQiskit:
 
         self._element_to_graph = None
         self._pargs = None
-        self._expectation_path = []
+        self._expectation_path = ExpectationPath()
         # self._subg_to_circuit = None
 
     def get_operator(self, element, qubit_num):
@@ -154,7 +155,7 @@ class CircuitByQiskit:
 
     def visualization(self):
         plt.figure()
-        plt.plot(range(1, len(self._expectation_path) + 1), self._expectation_path, "ob-", label="Qiskit")
+        plt.plot(range(1, len(self._expectation_path) + 1), self._expectation_path.values, "ob-", label="Qiskit")
         plt.ylabel('Expectation value')
         plt.xlabel('Number of iterations')
         plt.legend()
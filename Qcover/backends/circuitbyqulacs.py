@@ -12,6 +12,7 @@ import networkx as nx
 
 from qulacs import Observable, QuantumCircuit, QuantumState
 from qulacs.gate import RX, RZ, CNOT, merge
+from Qcover.backends.backend import ExpectationPath
 
 
 class CircuitByQulacs:
@@ -31,7 +32,7 @@ class CircuitByQulacs:
 
         self._element_to_graph = None
         self._pargs = None
-        self._expectation_path = []
+        self._expectation_path = ExpectationPath()
 
     @staticmethod
     def get_operator(element, qubit_num):
@@ -140,7 +141,7 @@ class CircuitByQulacs:
 
     def visualization(self):
         plt.figure()
-        plt.plot(range(1, len(self._expectation_path) + 1), self._expectation_path, "ob-", label="qulacs")
+        plt.plot(range(1, len(self._expectation_path) + 1), self._expectation_path.values, "ob-", label="qulacs")
         plt.ylabel('Expectation value')
         plt.xlabel('Number of iterations')
         plt.legend()
@@ -2,15 +2,53 @@ import itertools
 import os
 import time
 import warnings
-from collections import defaultdict, Callable
+from collections import Callable
+from collections import OrderedDict
 import numpy as np
 import matplotlib.pyplot as plt
 from multiprocessing import Pool, cpu_count
 import quimb as qu
+from threadpoolctl import threadpool_limits
 from multiprocessing import cpu_count
+from Qcover.backends.backend import ExpectationPath
+
+try:
+    from opt_einsum.paths import PathOptimizer, get_path_fn
+except ImportError:  # quimb without opt_einsum contracts with cotengra, which caches paths itself
+    PathOptimizer, get_path_fn = object, None
 
 expectation_path = []
 
+# most recently used contraction paths, module level so that pool workers keep them between tasks
+_MAX_CONTRACTION_PATHS = 2 ** 14
+_contraction_paths = OrderedDict()
+
+
+class ContractionPathCache(PathOptimizer):
+    """
+    opt_einsum path optimizer which searches the path of every distinct contraction only once,
+    the optimizer iterations change the gate angles but not the structure of the tensor networks
+    """
+
+    def __init__(self, method: str = 'greedy') -> None:
+        self._method = method
+
+    def __call__(self, inputs, output, size_dict, memory_limit=None):
+        # relabel the indices in order of appearance, so that equal structures share one key
+        labels = {}
+        terms = tuple(tuple(labels.setdefault(ix, len(labels)) for ix in sorted(term)) for term in inputs)
+        key = (self._method, terms, tuple(sorted(labels[ix] for ix in output)),
+               tuple(size_dict[ix] for ix in labels))
+
+        if key in _contraction_paths:
+            _contraction_paths.move_to_end(key)
+        else:
+            _contraction_paths[key] = get_path_fn(self._method)(inputs, output, size_dict, memory_limit)
+            if len(_contraction_paths) > _MAX_CONTRACTION_PATHS:
+                _contraction_paths.popitem(last=False)
+        return _contraction_paths[key]
+
+
 class CircuitByTensor:
     """generate a instance of tensor network circuit generated by quimb"""
 
@@ -29,43 +67,123 @@ class CircuitByTensor:
         self._edges_weight = edges_weight
         self._is_parallel = False if is_parallel is None else is_parallel
         self._opt = contract_opt
+        if get_path_fn is not None and isinstance(contract_opt, str):
+            # opt_einsum only takes PathOptimizer instances as custom strategies
+            self._opt = ContractionPathCache(contract_opt)
 
         self._element_to_graph = None
         self._pargs = None
-        self._expectation_path = []
-
-    def get_expectation(self, element_graph, p=None):
-        if self._is_parallel is False:
-            p = self._p if p is None else p
-            original_e, graph = element_graph
-        else:
-            p = self._p if len(element_graph) == 1 else element_graph[1]
-            original_e, graph = element_graph[0]
-
-        node_to_qubit = defaultdict(int)
-        node_list = list(graph.nodes)
-        for i in range(len(node_list)):
-            node_to_qubit[node_list[i]] = i
+        self._expectation_path = ExpectationPath()
+        self._pool = None
+        self._subgraph_meta = {}
+        self._meta_weights = None
+        self._edge_num = None
+        self._circuits = {}
+
+    def __getstate__(self):
+        # the process pool can not be sent to its own workers
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['_subgraph_meta'] = {}
+        state['_meta_weights'] = None
+        state['_circuits'] = {}
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        shut down the worker processes kept for parallel calculation, they are started again
+        by the next parallel calculation. Qcover.run calls it when the optimization finishes,
+        otherwise call it or use the backend as a context manager once the calculation is done
+        """
+        if getattr(self, '_pool', None) is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def get_subgraph_meta(self, graph):
+        """
+        get the qubit index of every node together with the weights and qubits of the
+        gates of a subgraph, which are shared by all iterations of the optimizer
+        Args:
+            graph (nx.Graph): the subgraph of an element of the original graph
+
+        Returns:
+            node_to_qubit (dict), nodes_w (np.array), edges_w (np.array), edge_qubits (list)
+        """
+        if self._meta_weights is None or self._meta_weights[0] is not self._nodes_weight \
+                or self._meta_weights[1] is not self._edges_weight:
+            self._subgraph_meta = {}
+            self._meta_weights = (self._nodes_weight, self._edges_weight)
+            self._edge_num = len({frozenset(edge) for edge in self._edges_weight})
+
+        # subgraphs are regenerated for every iteration, so they are identified by topology
+        key = (tuple(graph.nodes), tuple(graph.edges))
+        if key not in self._subgraph_meta:
+            node_list = list(graph.nodes)
+            node_to_qubit = {nd: i for i, nd in enumerate(node_list)}
+            nodes_w = np.array([self._nodes_weight[nd] for nd in node_list])
+            edge_list = [edge for edge in graph.edges if edge[0] != edge[1]]
+            edges_w = np.array([self._edges_weight[edge[0], edge[1]] for edge in edge_list])
+            edge_qubits = [(node_to_qubit[edge[0]], node_to_qubit[edge[1]]) for edge in edge_list]
+            self._subgraph_meta[key] = (node_to_qubit, nodes_w, edges_w, edge_qubits)
+        return self._subgraph_meta[key]
+
+    def get_circuit(self, graph, p):
+        """
+        get the qaoa circuit of a subgraph with the current parameters, the elements whose
+        subgraph grew to the whole original graph share one circuit and only differ in the
+        measured operator
+        Args:
+            graph (nx.Graph): the subgraph of an element of the original graph
+            p (int): the number of layers of the circuit
+
+        Returns:
+            circ (qu.tensor.Circuit), node_to_qubit (dict)
+        """
+        node_to_qubit, nodes_w, edges_w, edge_qubits = self.get_subgraph_meta(graph)
+        qubit_num = len(nodes_w)
+
+        # subgraphs of other elements differ from each other, so only the whole graph is shared
+        is_whole = qubit_num == len(self._nodes_weight) and graph.number_of_edges() == self._edge_num
+        key = (p, tuple(self._pargs))
+        if is_whole and key in self._circuits:
+            return self._circuits[key]
 
         gamma_list, beta_list = self._pargs[: p], self._pargs[p:]
-        circ = qu.tensor.Circuit(len(graph.nodes))
+        circ = qu.tensor.Circuit(qubit_num)
 
         for k in range(p):
-            for nd in graph.nodes:
-                u = node_to_qubit[nd]
+            for u in range(qubit_num):
                 if k == 0:
                     circ.apply_gate('H', u)
-                circ.apply_gate('rz', 2 * gamma_list[k] * self._nodes_weight[nd], u)
+                circ.apply_gate('rz', 2 * gamma_list[k] * nodes_w[u], u)
+
+            for j in range(len(edge_qubits)):
+                u, v = edge_qubits[j]
+                circ.apply_gate('RZZ', -gamma_list[k] * edges_w[j], u, v)
 
-            for edge in graph.edges:
-                u, v = node_to_qubit[edge[0]], node_to_qubit[edge[1]]
-                if u == v:
-                    continue
-                circ.apply_gate('RZZ', -gamma_list[k] * self._edges_weight[edge[0], edge[1]], u, v)
+            for u in range(qubit_num):
+                circ.apply_gate('rx', 2 * beta_list[k], u)
 
-            for nd in graph.nodes:
-                circ.apply_gate('rx', 2 * beta_list[k], node_to_qubit[nd])
+        if is_whole:
+            self._circuits[key] = (circ, node_to_qubit)
+        return circ, node_to_qubit
 
+    def get_expectation(self, element_graph, p=None):
+        if self._is_parallel is False:
+            p = self._p if p is None else p
+            original_e, graph = element_graph
+        else:
+            p = self._p if len(element_graph) == 1 else element_graph[1]
+            original_e, graph = element_graph[0]
+
+        circ, node_to_qubit = self.get_circuit(graph, p)
         if isinstance(original_e, int):
             weight = self._nodes_weight[original_e]
             where = node_to_qubit[original_e]
@@ -77,19 +195,19 @@ class CircuitByTensor:
             exp_res = circ.local_expectation(ZZ, where, optimize=self._opt)
         return exp_res.real * weight
 
+    def get_expectation_sum(self, element_graphs):
+        """sum up the expectations of a batch of elements in one worker"""
+        return sum(self.get_expectation(element_graph) for element_graph in element_graphs)
+
     def expectation_calculation(self, p=None):
+        # circuits of earlier parameters are not used again
+        self._circuits = {}
         if self._is_parallel:
             return self.expectation_calculation_parallel(p)
         else:
             return self.expectation_calculation_serial(p)
 
     def expectation_calculation_serial(self, p=None):
-        cpu_num = cpu_count()
-        os.environ['OMP_NUM_THREADS'] = str(cpu_num)
-        os.environ['OPENBLAS_NUM_THREADS'] = str(cpu_num)
-        os.environ['MKL_NUM_THREADS'] = str(cpu_num)
-        os.environ['VECLIB_MAXIMUM_THREADS'] = str(cpu_num)
-        os.environ['NUMEXPR_NUM_THREADS'] = str(cpu_num)
         res = 0
         for item in self._element_to_graph.items():
             res += self.get_expectation(item, p)
@@ -99,30 +217,24 @@ class CircuitByTensor:
         return res
 
     def expectation_calculation_parallel(self, p=None):
-        cpu_num = 1
-        os.environ['OMP_NUM_THREADS'] = str(cpu_num)
-        os.environ['OPENBLAS_NUM_THREADS'] = str(cpu_num)
-        os.environ['MKL_NUM_THREADS'] = str(cpu_num)
-        os.environ['VECLIB_MAXIMUM_THREADS'] = str(cpu_num)
-        os.environ['NUMEXPR_NUM_THREADS'] = str(cpu_num)
-
-        circ_res = []
         args = list(itertools.product(self._element_to_graph.items(), [p]))
-        pool = Pool(os.cpu_count())
-        circ_res.append(pool.map(self.get_expectation, args))
-        # circ_res.append(pool.map(self.get_expectation, list(self._element_to_graph.items()), chunksize=1))
-
-        pool.terminate()  # pool.close()
-        pool.join()
+        if self._pool is None:
+            # every worker runs on one thread, the libraries are already loaded in forked workers
+            self._pool = Pool(os.cpu_count(), initializer=threadpool_limits, initargs=(1,))
 
-        res = sum(circ_res[0])
+        # hand out a few batches per worker and only send back one partial sum per batch
+        chunk_size = max(1, len(args) // (4 * cpu_count()))
+        chunks = [args[i: i + chunk_size] for i in range(0, len(args), chunk_size)]
+        res = 0
+        for chunk_res in self._pool.imap_unordered(self.get_expectation_sum, chunks):
+            res += chunk_res
         print("Total expectation of original graph is: ", res)
         self._expectation_path.append(res)
         return res
 
     def visualization(self):
         plt.figure()
-        plt.plot(range(1, len(self._expectation_path) + 1), self._expectation_path, "ob-", label="quimb")
+        plt.plot(range(1, len(self._expectation_path) + 1), self._expectation_path.values, "ob-", label="quimb")
         plt.ylabel('Expectation value')
         plt.xlabel('Number of iterations')
         plt.legend()
@@ -314,7 +314,12 @@ class Qcover:
         self._backend._edges_weight = self._edges_weight
         self._backend._is_parallel = is_parallel
 
-        x, fun, nfev = self._optimizer.optimize(objective_function=self.calculate, p=self._p)
+        try:
+            x, fun, nfev = self._optimizer.optimize(objective_function=self.calculate, p=self._p)
+        finally:
+            if isinstance(self._backend, CircuitByTensor):
+                # the worker processes of the parallel calculation are not needed any more
+                self._backend.close()
         res = {"Optimal parameter value:": x, "Expectation of Hamiltonian": fun, "Total iterations": nfev}
         return res
 
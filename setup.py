@@ -28,11 +28,13 @@ exec(open('Qcover/version.py').read())
 
 requirements = [
     "networkx==2.5.1",
+    "scipy==1.7.1",
     "qiskit==0.31.0",
     "projectq==0.6.1.post0",
     "cirq==0.13.0",
     "quimb==1.3.0",
     "qulacs==0.3.0",
+    "threadpoolctl==3.0.0",
 ]
 
 setup(
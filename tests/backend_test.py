@@ -0,0 +1,35 @@
+import numpy as np
+import networkx as nx
+from Qcover.backends.backend import ExpectationPath
+from Qcover.backends.circuitbytensor import CircuitByTensor
+
+
+def test_expectation_path_grows():
+    path = ExpectationPath()
+    values = np.linspace(-1., 1., 150)
+    for val in values:
+        path.append(val)
+
+    assert len(path) == 150
+    assert np.array_equal(path.values, values)
+    assert path[0] == values[0] and path[63] == values[63] and path[-1] == values[-1]
+    assert list(path) == list(values)
+
+
+def test_tensor_whole_graph_circuit_follows_parameters():
+    graph = nx.cycle_graph(4)
+    nodes_weight = {nd: 0.5 * (nd + 1) for nd in graph.nodes}
+    edges_weight = {}
+    for u, v in graph.edges:
+        edges_weight[u, v] = edges_weight[v, u] = 1. + u
+
+    def expectation(backend, pargs):
+        backend._p, backend._pargs = 2, pargs
+        return backend.get_expectation((0, graph))
+
+    backend = CircuitByTensor(nodes_weight=nodes_weight, edges_weight=edges_weight)
+    expectation(backend, [0.3, 0.5, 0.2, 0.7])
+    res = expectation(backend, [0.1, 0.9, 0.4, 0.6])
+
+    fresh = CircuitByTensor(nodes_weight=nodes_weight, edges_weight=edges_weight)
+    assert np.isclose(res, expectation(fresh, [0.1, 0.9, 0.4, 0.6]))
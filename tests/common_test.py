@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+import networkx as nx
+from scipy import sparse
+from Qcover.applications.common import get_weights_graph, get_most_small_ising
+
+
+def _edge_weights(graph):
+    return {tuple(sorted(ed)): w for ed, w in nx.get_edge_attributes(graph, 'weight').items()}
+
+
+def test_weights_graph_non_symmetric():
+    # the lower triangle wins where it is nonzero, the upper one is kept otherwise
+    ising_mat = np.array([[1., 0., 2.],
+                          [3., 5., 0.],
+                          [0., 4., 6.]])
+    graph = get_weights_graph(ising_mat)
+    assert _edge_weights(graph) == {(0, 1): 3., (0, 2): 2., (1, 2): 4.}
+    assert nx.get_node_attributes(graph, 'weight') == {0: 1., 1: 5., 2: 6.}
+
+
+def test_sparse_weights_graph_non_symmetric():
+    ising_mat = np.array([[1., 0., 2.],
+                          [3., 5., 0.],
+                          [0., 4., 6.]])
+    graph = get_weights_graph(sparse.csr_matrix(ising_mat))
+    assert _edge_weights(graph) == _edge_weights(get_weights_graph(ising_mat))
+    assert nx.get_node_attributes(graph, 'weight') == {0: 1., 1: 5., 2: 6.}
+
+
+def test_ising_kernel_matches_numpy():
+    pytest.importorskip('numba')
+    from Qcover.applications.ising_kernel import ising_energy
+
+    rng = np.random.default_rng(0)
+    spins = rng.choice(np.array([-1, 1], dtype=np.int8), size=(50, 6))
+    h = rng.uniform(-1., 1., 6)
+    u_idx, v_idx = np.array([0, 1, 2, 0]), np.array([1, 2, 5, 4])
+    edges_w = rng.uniform(-1., 1., 4)
+
+    expected = spins @ h + (spins[:, u_idx] * spins[:, v_idx] * edges_w).sum(axis=1)
+    assert np.allclose(ising_energy(spins, h, u_idx, v_idx, edges_w), expected)
+
+
+def _lowest_energy_state(state_count, graph):
+    # plain loop over the sampled states, the first state with the lowest energy wins
+    nodew = nx.get_node_attributes(graph, 'weight')
+    edw = nx.get_edge_attributes(graph, 'weight')
+    res_state, min_h = None, None
+    for key in state_count:
+        spins = [1 if bit == '1' else -1 for bit in key]
+        tmp_h = sum(w * spins[nd] for nd, w in nodew.items())
+        tmp_h += sum(w * spins[u] * spins[v] for (u, v), w in edw.items() if u != v)
+        if min_h is None or tmp_h < min_h:
+            min_h, res_state = tmp_h, [int(bit) for bit in key]
+    return res_state
+
+
+def test_most_small_ising_matches_loop():
+    rng = np.random.default_rng(1)
+    graph = nx.random_regular_graph(3, 10, seed=2)
+    graph.add_edges_from([(0, 0), (4, 4)])
+    for nd in graph.nodes:
+        graph.nodes[nd]['weight'] = rng.uniform(-1., 1.)
+    for u, v in graph.edges:
+        graph[u][v]['weight'] = rng.uniform(-1., 1.)
+
+    state_count = {''.join(map(str, rng.integers(0, 2, 10))): 1 for _ in range(200)}
+    assert get_most_small_ising(state_count, graph) == _lowest_energy_state(state_count, graph)
+
+
+def test_most_small_ising_tie_keeps_first():
+    graph = nx.Graph()
+    graph.add_nodes_from([(0, {'weight': 0}), (1, {'weight': 0})])
+    graph.add_weighted_edges_from([(0, 1, 1), (1, 1, 5)])
+
+    # '10' and '01' both have the lowest energy -1
+    state_count = {'11': 3, '10': 1, '01': 2}
+    assert get_most_small_ising(state_count, graph) == [1, 0]
+    assert _lowest_energy_state(state_count, graph) == [1, 0]
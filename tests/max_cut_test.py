@@ -0,0 +1,16 @@
+import numpy as np
+import networkx as nx
+from scipy import sparse
+from Qcover.applications.max_cut import MaxCut
+
+
+def test_max_cut_values_match_single_cuts():
+    mxt = MaxCut(graph=nx.random_regular_graph(3, 8, seed=1))
+    w = nx.adjacency_matrix(mxt.graph).toarray().astype(float)
+    X = np.random.default_rng(0).integers(0, 2, size=(16, 8))
+
+    # the outer product formula used before max_cut_value was rewritten
+    expected = np.array([np.sum(w * np.outer(x, 1 - x)) for x in X])
+    assert np.allclose([mxt.max_cut_value(x, w) for x in X], expected)
+    assert np.allclose(mxt.max_cut_values(X, w), expected)
+    assert np.allclose(mxt.max_cut_values(X, sparse.csr_matrix(w)), expected)